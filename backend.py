@@ -5,10 +5,12 @@ Handles CSV loading, parsing, and PDF generation.
 """
 
 import csv
+import io
 import os
 import re
-from collections import defaultdict
+from collections import Counter
 from datetime import datetime
+from functools import lru_cache
 
 # ReportLab imports for PDF generation
 try:
@@ -21,19 +23,16 @@ try:
 except ImportError:
     print("ReportLab library not found. Please install it using: pip install reportlab")
 
+# Trailing size suffix, e.g. "Rash Guard - XL" or "Rash Guard / XL"
+_SIZE_RE = re.compile(r'\s*[-/]\s*(\d*X*[SML]+)\s*$')
+
+
+@lru_cache(maxsize=8192)
 def extract_base_name_and_size(item_name):
     """Extract base product name and size from full item name."""
-    size_patterns = [
-        r'\s*-\s*(\d*X*[SML]+)\s*$',
-        r'\s*/\s*(\d*X*[SML]+)\s*$',
-    ]
-    
-    for pattern in size_patterns:
-        match = re.search(pattern, item_name)
-        if match:
-            size = match.group(1)
-            base_name = re.sub(pattern, '', item_name).strip()
-            return base_name, size
+    match = _SIZE_RE.search(item_name)
+    if match:
+        return item_name[:match.start()].strip(), match.group(1)
     
     return item_name, None
 
@@ -43,44 +42,70 @@ def load_orders(csv_file="orders_export.csv"):
     if not csv_file or not os.path.exists(csv_file):
         return {}
     
-    products = defaultdict(lambda: defaultdict(int))
+    # Exports repeat the same line item once per order, so total each
+    # distinct item name first and only split out sizes per unique name.
+    item_totals = Counter()
     
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
+    with open(csv_file, 'r', encoding='utf-8', newline='', buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        
+        try:
+            name_idx = header.index('Lineitem name')
+            quantity_idx = header.index('Lineitem quantity')
+        except ValueError:
+            return {}
+        min_len = max(name_idx, quantity_idx) + 1
         
         for row in reader:
-            item_name = row.get('Lineitem name', '').strip()
-            quantity_str = row.get('Lineitem quantity', '').strip()
+            if len(row) < min_len:
+                continue
+            
+            item_name = row[name_idx].strip()
+            quantity_str = row[quantity_idx].strip()
             
             if not item_name or not quantity_str:
                 continue
             
-            try:
-                quantity = int(quantity_str)
-                base_name, size = extract_base_name_and_size(item_name)
-                
-                if size:
-                    products[base_name][size] += quantity
-                else:
-                    products[base_name]['N/A'] += quantity
-                    
-            except ValueError:
+            # Any isdecimal() string parses with int(), so junk rows are
+            # skipped without raising
+            if not quantity_str.isdecimal():
                 continue
+            
+            item_totals[item_name] += int(quantity_str)
+    
+    # Different spellings ("Shirt - M", "Shirt / M") fold into one key here
+    size_totals = Counter()
+    for item_name, quantity in item_totals.items():
+        base_name, size = extract_base_name_and_size(item_name)
+        size_totals[(base_name, size or 'N/A')] += quantity
+    
+    products = {}
+    for (base_name, size), quantity in size_totals.items():
+        sizes = products.get(base_name)
+        if sizes is None:
+            sizes = products[base_name] = {}
+        sizes[size] = quantity
     
     return products
 
 
-def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, output_file, logo_path=None):
-    """Generate a PDF purchase order matching the reference layout."""
-    doc = SimpleDocTemplate(output_file, pagesize=letter,
-                           leftMargin=0.5*inch, rightMargin=0.5*inch,
-                           topMargin=0.5*inch, bottomMargin=0.5*inch)
+# Paragraph and table styles don't depend on the PO contents, so they are
+# built once on first use (reportlab may not be installed at import time).
+_STYLES_READY = False
+
+
+def _init_styles():
+    """Build the shared PDF styles on first call."""
+    global _STYLES_READY, _STYLES, _TITLE_STYLE, _COMPANY_STYLE
+    global _HEADER_LABEL_STYLE, _HEADER_VALUE_STYLE, _SECTION_HEADER_STYLE
+    global _SECTION_TABLE_STYLE, _SIZE_TABLE_STYLE
+    if _STYLES_READY:
+        return
     
-    story = []
-    styles = getSampleStyleSheet()
+    styles = _STYLES = getSampleStyleSheet()
     
-    # Custom styles
-    title_style = ParagraphStyle(
+    _TITLE_STYLE = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
         fontSize=28,
@@ -89,7 +114,7 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         fontName='Helvetica-Bold'
     )
     
-    company_style = ParagraphStyle(
+    _COMPANY_STYLE = ParagraphStyle(
         'CompanyStyle',
         parent=styles['Normal'],
         fontSize=10,
@@ -97,7 +122,7 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         alignment=TA_LEFT
     )
     
-    header_label_style = ParagraphStyle(
+    _HEADER_LABEL_STYLE = ParagraphStyle(
         'HeaderLabel',
         parent=styles['Normal'],
         fontSize=10,
@@ -105,14 +130,14 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         alignment=TA_LEFT
     )
     
-    header_value_style = ParagraphStyle(
+    _HEADER_VALUE_STYLE = ParagraphStyle(
         'HeaderValue',
         parent=styles['Normal'],
         fontSize=10,
         alignment=TA_LEFT
     )
 
-    section_header_style = ParagraphStyle(
+    _SECTION_HEADER_STYLE = ParagraphStyle(
         'SectionHeader',
         parent=styles['Normal'],
         fontSize=11,
@@ -121,6 +146,80 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         alignment=TA_LEFT
     )
     
+    _SECTION_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0,0), (0,0), colors.HexColor('#003366')), # Dark Blue Header
+        ('TEXTCOLOR', (0,0), (0,0), colors.white),
+        ('BOTTOMPADDING', (0,0), (0,0), 6),
+        ('TOPPADDING', (0,0), (0,0), 6),
+        ('VALIGN', (0,1), (0,1), 'TOP'),
+        ('TOPPADDING', (0,1), (0,1), 6),
+    ])
+    
+    _SIZE_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#003366')), # Header Blue
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'), 
+        ('LEFTPADDING', (0, 0), (0, -1), 12),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e8f0f7')), # Total Row Light Blue
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ])
+    
+    _STYLES_READY = True
+
+
+# (path, mtime) -> (draw width, draw height, raw file bytes)
+_LOGO_CACHE = {}
+
+
+def _load_logo(logo_path):
+    """Return a sized logo Image, reusing the file bytes while it is unchanged."""
+    key = (logo_path, os.path.getmtime(logo_path))
+    cached = _LOGO_CACHE.get(key)
+    
+    if cached is None:
+        with open(logo_path, 'rb') as f:
+            data = f.read()
+        
+        # Resize image to fit in ~2 inch width/height max while keeping aspect ratio
+        img = Image(io.BytesIO(data))
+        img_width = img.drawWidth
+        img_height = img.drawHeight
+        max_dim = 1.5 * inch
+        
+        if img_width > max_dim or img_height > max_dim:
+            ratio = min(max_dim/img_width, max_dim/img_height)
+            img_width *= ratio
+            img_height *= ratio
+        
+        # Only the current version of the logo is worth keeping
+        _LOGO_CACHE.clear()
+        cached = _LOGO_CACHE[key] = (img_width, img_height, data)
+    
+    img_width, img_height, data = cached
+    return Image(io.BytesIO(data), width=img_width, height=img_height)
+
+
+def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, output_file, logo_path=None):
+    """Generate a PDF purchase order matching the reference layout."""
+    doc = SimpleDocTemplate(output_file, pagesize=letter,
+                           leftMargin=0.5*inch, rightMargin=0.5*inch,
+                           topMargin=0.5*inch, bottomMargin=0.5*inch)
+    
+    story = []
+    _init_styles()
+    styles = _STYLES
+    title_style = _TITLE_STYLE
+    company_style = _COMPANY_STYLE
+    header_label_style = _HEADER_LABEL_STYLE
+    header_value_style = _HEADER_VALUE_STYLE
+    section_header_style = _SECTION_HEADER_STYLE
+    
     # --- Top Header Section ---
     # Left Column: Logo (optional) -> Company Info
     # Right Column: "Purchase Order" Title -> Date/PO#
@@ -129,18 +228,7 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
     logo = []
     if logo_path and os.path.exists(logo_path):
         try:
-            # Resize image to fit in ~2 inch width/height max while keeping aspect ratio
-            img = Image(logo_path)
-            img_width = img.drawWidth
-            img_height = img.drawHeight
-            max_dim = 1.5 * inch
-            
-            if img_width > max_dim or img_height > max_dim:
-                ratio = min(max_dim/img_width, max_dim/img_height)
-                img.drawWidth = img_width * ratio
-                img.drawHeight = img_height * ratio
-            
-            logo = [img]
+            logo = [_load_logo(logo_path)]
         except Exception as e:
             print(f"Error loading logo: {e}")
             logo = [Paragraph("[Logo Error]", styles['Normal'])]
@@ -194,28 +282,29 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         ('RIGHTPADDING', (0,0), (-1,-1), 0),
     ]))
     
-    story.append(top_table)
-    story.append(Spacer(1, 0.4*inch))
-    
     # --- Vendor and Ship To Section (Blue Headers) ---
+    def optional_paragraph(text):
+        # Paragraph parses its markup on construction, so skip blank fields up front
+        return Paragraph(text, company_style) if text and text.strip() else None
+
     vendor_block = [
-        paragraph for paragraph in [
-            Paragraph(f"<b>{vendor_info['name']}</b>", company_style),
-            Paragraph(f"{vendor_info['website']}", company_style) if vendor_info['website'] else None,
-            Paragraph(f"{vendor_info['address']}", company_style),
-            Paragraph(f"{vendor_info['city']}", company_style),
-            Paragraph(f"Phone: {vendor_info['phone']}", company_style),
-        ] if paragraph is not None
+        paragraph for paragraph in (
+            optional_paragraph(f"<b>{vendor_info['name']}</b>"),
+            optional_paragraph(vendor_info['website']),
+            optional_paragraph(vendor_info['address']),
+            optional_paragraph(vendor_info['city']),
+            optional_paragraph(f"Phone: {vendor_info['phone']}"),
+        ) if paragraph is not None
     ]
     
     ship_to_block = [
-         paragraph for paragraph in [
-            Paragraph(f"Attn: {ship_to_info['attn']}", company_style),
-            Paragraph(f"{ship_to_info['company']}", company_style),
-            Paragraph(f"{ship_to_info['address']}", company_style),
-            Paragraph(f"{ship_to_info['city']}", company_style) if ship_to_info.get('city') else None,
-            Paragraph(f"Phone: {ship_to_info['phone']}", company_style),
-        ] if paragraph is not None
+        paragraph for paragraph in (
+            optional_paragraph(f"Attn: {ship_to_info['attn']}"),
+            optional_paragraph(ship_to_info['company']),
+            optional_paragraph(ship_to_info['address']),
+            optional_paragraph(ship_to_info.get('city')),
+            optional_paragraph(f"Phone: {ship_to_info['phone']}"),
+        ) if paragraph is not None
     ]
 
     def create_section_table(header_text, content_blocks):
@@ -225,14 +314,7 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         t_data.append([content_blocks])
         
         t = Table(t_data, colWidths=[3.5*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (0,0), colors.HexColor('#003366')), # Dark Blue Header
-            ('TEXTCOLOR', (0,0), (0,0), colors.white),
-            ('BOTTOMPADDING', (0,0), (0,0), 6),
-            ('TOPPADDING', (0,0), (0,0), 6),
-            ('VALIGN', (0,1), (0,1), 'TOP'),
-            ('TOPPADDING', (0,1), (0,1), 6),
-        ]))
+        t.setStyle(_SECTION_TABLE_STYLE)
         return t
 
     vendor_table = create_section_table("Vendor", vendor_block)
@@ -244,20 +326,12 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         ('VALIGN', (0,0), (-1,-1), 'TOP'),
     ]))
     
-    story.append(container_table)
-    story.append(Spacer(1, 0.4*inch))
+    story.extend((top_table, Spacer(1, 0.4*inch), container_table, Spacer(1, 0.4*inch)))
     
     # --- Product Details Section ---
     
     # Loop through all selected products
     for product_name, sizes_dict in products_data:
-        # Keep product parts together to avoid breaking headers from content
-        product_parts = []
-        
-        product_parts.append(Paragraph(f"<b>Item Details</b>", section_header_style)) 
-        product_parts.append(Paragraph(f"Product: <b>{product_name}</b>", styles['Normal']))
-        product_parts.append(Spacer(1, 0.1*inch))
-        
         # Size breakdown table
         size_data = [['Size', 'Quantity']]
         sorted_sizes = sorted(sizes_dict.items(), key=lambda x: (
@@ -273,24 +347,18 @@ def generate_pdf_po(products_data, company_info, vendor_info, ship_to_info, outp
         size_data.append(['TOTAL', str(total_qty)])
         
         size_table = Table(size_data, colWidths=[5.5*inch, 2*inch])
-        size_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#003366')), # Header Blue
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'), 
-            ('LEFTPADDING', (0, 0), (0, -1), 12),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('BOX', (0, 0), (-1, -1), 1, colors.black),
-            ('INNERGRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e8f0f7')), # Total Row Light Blue
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ]))
-        product_parts.append(size_table)
-        product_parts.append(Spacer(1, 0.3*inch))
+        size_table.setStyle(_SIZE_TABLE_STYLE)
+        
+        # Keep product parts together to avoid breaking headers from content
+        product_parts = (
+            Paragraph(f"<b>Item Details</b>", section_header_style),
+            Paragraph(f"Product: <b>{product_name}</b>", styles['Normal']),
+            Spacer(1, 0.1*inch),
+            size_table,
+            Spacer(1, 0.3*inch),
+        )
         
-        # Add to story using KeepTogether if possible, or just append
+        # Add to story using KeepTogether if possible, or just extend
         story.extend(product_parts)
     
     # Build PDF
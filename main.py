@@ -6,15 +6,48 @@ Generates PDF purchase orders from orders_export.csv using a layout matching the
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
+import hashlib
 import json
 import os
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from backend import load_orders, generate_pdf_po
     # We will let the GUI start but warn on generation if missing
 
 
+# orjson is optional; fall back to the stdlib with the same output format
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Maps every ASCII character that isn't a letter or digit to "_" for file names
+_SAFE_KEEP = set(string.ascii_letters + string.digits)
+_SAFE_TABLE = {i: (chr(i) if chr(i) in _SAFE_KEEP else '_') for i in range(128)}
+# \W matches exactly the characters str.isalnum() rejects (plus "_", which maps to itself)
+_UNSAFE_RE = re.compile(r'\W')
+
+
+def _safe_filename(name):
+    if name.isascii():
+        return name.translate(_SAFE_TABLE)
+    return _UNSAFE_RE.sub('_', name)
+
 
 class POGeneratorApp:
     def __init__(self, root):
@@ -26,22 +59,26 @@ class POGeneratorApp:
         self.settings_file = "settings.json"
         self.load_settings()
         
+        # PDFs are built off the Tk thread; one worker keeps builds in order
+        self._pdf_pool = ThreadPoolExecutor(max_workers=1)
+        
         
         # Load default products if available
         self.products = load_orders("orders_export.csv")
-        self.sorted_products = []
-        if self.products:
-             self.sorted_products = sorted(self.products.items(), key=lambda x: x[0])
+        self.index_products()
         
         # Create UI
         self.create_widgets()
         
     def load_settings(self):
         self.settings = {}
+        self._last_settings_hash = None
         if os.path.exists(self.settings_file):
             try:
-                with open(self.settings_file, 'r') as f:
-                    self.settings = json.load(f)
+                with open(self.settings_file, 'rb') as f:
+                    raw = f.read()
+                self.settings = _loads(raw)
+                self._last_settings_hash = hashlib.blake2b(raw, digest_size=16).digest()
             except Exception as e:
                 print(f"Error loading settings: {e}")
         
@@ -77,8 +114,18 @@ class POGeneratorApp:
                 current_settings['saved_vendors'].append(current_vendor)
         
         try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(current_settings, f, indent=4)
+            new_bytes = _dumps(current_settings)
+            new_hash = hashlib.blake2b(new_bytes, digest_size=16).digest()
+            
+            # Skip the write when nothing changed; otherwise replace the file
+            # atomically so a crash mid-write can't leave it truncated
+            if new_hash != self._last_settings_hash:
+                tmp_file = self.settings_file + '.tmp'
+                with open(tmp_file, 'wb') as f:
+                    f.write(new_bytes)
+                os.replace(tmp_file, self.settings_file)
+                self._last_settings_hash = new_hash
+            
             self.settings = current_settings # Update internal state
             
             # Refresh vendor combobox if it exists
@@ -107,9 +154,9 @@ class POGeneratorApp:
         bottom_frame = ttk.Frame(main_frame)
         bottom_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 5))
         
-        generate_btn = ttk.Button(bottom_frame, text="Generate", 
-                                  command=self.generate_po, style='Accent.TButton')
-        generate_btn.pack(side=tk.RIGHT, ipadx=20, ipady=5)
+        self.generate_btn = ttk.Button(bottom_frame, text="Generate", 
+                                       command=self.generate_po, style='Accent.TButton')
+        self.generate_btn.pack(side=tk.RIGHT, ipadx=20, ipady=5)
         
         # --- Content Area (Vertical Split) ---
         content_paned = ttk.PanedWindow(main_frame, orient=tk.VERTICAL)
@@ -124,6 +171,11 @@ class POGeneratorApp:
         btn_frame.pack(fill=tk.X, pady=(0, 2))
         ttk.Button(btn_frame, text="Load CSV File...", command=self.load_csv).pack(side=tk.LEFT)
         
+        # Filter products by name as you type
+        self.filter_var = tk.StringVar()
+        ttk.Entry(btn_frame, textvariable=self.filter_var, width=20).pack(side=tk.RIGHT)
+        ttk.Label(btn_frame, text="Filter:").pack(side=tk.RIGHT, padx=(0, 5))
+        
         scrollbar = ttk.Scrollbar(product_frame)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
@@ -134,6 +186,7 @@ class POGeneratorApp:
         
         # Populate list
         self.refresh_product_list()
+        self.filter_var.trace_add('write', lambda *args: self.refresh_product_list())
 
         # Bottom Frame (Inputs)
         details_frame = ttk.LabelFrame(content_paned, text="2. Edit Details", padding="5")
@@ -170,17 +223,31 @@ class POGeneratorApp:
                 return
             
             self.products = loaded_products
+            self.index_products()
             self.refresh_product_list()
             messagebox.showinfo("Success", f"Loaded {len(self.products)} products.")
 
+    def index_products(self):
+        # Sort and total once per load; the listbox only reads these
+        self.sorted_products = sorted(self.products.items(), key=lambda x: x[0])
+        self._totals = {name: sum(sizes.values()) for name, sizes in self.products.items()}
+        self._search_names = {name: name.casefold() for name in self.products}
+
     def refresh_product_list(self):
         self.product_listbox.delete(0, tk.END)
-        self.sorted_products = sorted(self.products.items(), key=lambda x: x[0])
         
-        for product_name, sizes in self.sorted_products:
-            total_qty = sum(sizes.values())
-            display_text = f"{product_name} ({total_qty} units)"
-            self.product_listbox.insert(tk.END, display_text)
+        # Filtering the already sorted list keeps it in order without re-sorting
+        query = self.filter_var.get().strip().casefold()
+        if query:
+            self.displayed_products = [item for item in self.sorted_products
+                                       if query in self._search_names[item[0]]]
+        else:
+            self.displayed_products = self.sorted_products
+        
+        # One insert call for all rows instead of a Tcl round-trip per row
+        display_list = [f"{name} ({self._totals[name]} units)" for name, _ in self.displayed_products]
+        if display_list:
+            self.product_listbox.insert(tk.END, *display_list)
 
     def create_company_info_fields(self, parent):
         self.company_vars = {}
@@ -315,7 +382,7 @@ class POGeneratorApp:
         # Collect all selected products
         selected_products = []
         for idx in selection:
-            selected_products.append(self.sorted_products[idx])
+            selected_products.append(self.displayed_products[idx])
         
         # Get all field values
         company_info = {key: var.get() for key, var in self.company_vars.items()}
@@ -328,7 +395,7 @@ class POGeneratorApp:
         
         if len(selected_products) == 1:
             prod_name = selected_products[0][0]
-            safe_name = "".join(c if c.isalnum() else "_" for c in prod_name)
+            safe_name = _safe_filename(prod_name)
             default_filename = f"PO_{safe_name}_{timestamp}.pdf"
         else:
             default_filename = f"PO_Multiple_Items_{timestamp}.pdf"
@@ -342,10 +409,22 @@ class POGeneratorApp:
         if not filename:
             return
         
-        try:
-            generate_pdf_po(selected_products, company_info, vendor_info, ship_to_info, filename, logo_path)
+        self.generate_btn.config(state=tk.DISABLED)
+        future = self._pdf_pool.submit(generate_pdf_po, selected_products, company_info,
+                                       vendor_info, ship_to_info, filename, logo_path)
+        self.root.after(100, self._check_pdf, future, filename)
+
+    def _check_pdf(self, future, filename):
+        # Poll from the Tk thread; widgets must not be touched from the worker
+        if not future.done():
+            self.root.after(100, self._check_pdf, future, filename)
+            return
+        
+        self.generate_btn.config(state=tk.NORMAL)
+        e = future.exception()
+        if e is None:
             messagebox.showinfo("Success", f"Purchase Order generated successfully!\n\nSaved to: {filename}")
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"Failed to generate PDF:\n{str(e)}\n\n(Make sure 'reportlab' is installed)")
 
 